@@ -1,30 +1,135 @@
+import os
+
+# Lancement direct (python app.py): le nombre de workers doit être fixé avant
+# l'import de sentiment_analyzer, qui en déduit les threads OpenMP/MKL hérités
+# par les workers
+if __name__ == "__main__":
+    os.environ.setdefault("WEB_CONCURRENCY", "4")
+
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import asyncio
+import atexit
 import logging
-import os
-from sentiment_analyzer import SentimentAnalyzer
-from models import TextRequest, SentimentResponse, ErrorResponse
+import queue
+from sentiment_analyzer import MODEL_NAME, SentimentAnalyzer
+from models import MAX_BATCH_SIZE, BatchRequest, TextRequest, SentimentResponse, ErrorResponse
+from typing import List
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from starlette.status import HTTP_400_BAD_REQUEST
 
-# Configuration des logs
+# Configuration des logs: les requêtes ne font qu'empiler les records dans une
+# file, l'écriture sur stderr est faite par un thread dédié (QueueListener)
+log_queue = queue.SimpleQueue()
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+))
+log_listener = QueueListener(log_queue, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+# Micro-batching: les requêtes /predict concurrentes arrivées dans une fenêtre
+# de MAX_WAIT_MS sont regroupées en un seul forward (au plus MAX_BATCH textes)
+MAX_BATCH = 32
+MAX_WAIT_MS = 8
+
+# Chargé par le lifespan, dans chaque worker (jamais dans le processus superviseur)
+analyzer = None
+batch_queue = None
+
+# Un seul forward à la fois par worker (batcher et /predict_batch): le budget de
+# threads du worker est respecté et les backends non réentrants (requête
+# d'inférence OpenVINO partagée) ne sont jamais appelés en parallèle
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+
+async def batcher(pending: asyncio.Queue):
+    """Vide la file par lots et résout le Future de chaque requête"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await pending.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(pending.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        texts = [text for text, _ in batch]
+        try:
+            # Le forward est bloquant: on l'exécute hors de la boucle d'événements
+            results = await loop.run_in_executor(inference_executor, analyzer.analyze_batch, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+async def analyze_batched(text: str) -> dict:
+    """Soumet un texte au batcher et attend son résultat"""
+    if batch_queue is None:
+        # Batcher non démarré (lifespan non exécuté): analyse directe
+        return await asyncio.get_running_loop().run_in_executor(
+            inference_executor, analyzer.analyze, text
+        )
+    
+    future = asyncio.get_running_loop().create_future()
+    await batch_queue.put((text, future))
+    return await future
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Charge le modèle puis démarre le batcher en tâche de fond"""
+    global analyzer, batch_queue
+    try:
+        analyzer = SentimentAnalyzer()
+        logger.info("✅ Modèle d'analyse de sentiment chargé avec succès")
+    except Exception as e:
+        logger.error(f"❌ Erreur lors du chargement du modèle: {e}")
+        analyzer = None
+    
+    task = None
+    if analyzer is not None:
+        batch_queue = asyncio.Queue()
+        task = asyncio.create_task(batcher(batch_queue))
+    yield
+    if task is not None:
+        task.cancel()
+    batch_queue = None
+
+
 # Création de l'application FastAPI
 app = FastAPI(
     title="Sentiment Analysis API",
-    description="API d'analyse de sentiment utilisant DistilBERT",
+    description="API d'analyse de sentiment (classification NEGATIVE/POSITIVE)",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configuration CORS
@@ -40,20 +145,12 @@ app.add_middleware(
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Initialisation de l'analyseur de sentiment
-try:
-    analyzer = SentimentAnalyzer()
-    logger.info("✅ Modèle d'analyse de sentiment chargé avec succès")
-except Exception as e:
-    logger.error(f"❌ Erreur lors du chargement du modèle: {e}")
-    analyzer = None
-
 @app.get("/")
 async def serve_homepage():
     """Servir la page d'accueil ou un message JSON"""
     if os.path.exists("static/index.html"):
         return FileResponse("static/index.html")
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "message": "API d'analyse de sentiment opérationnelle",
         "docs": "/docs"
     })
@@ -70,7 +167,7 @@ async def health_check():
     logger.info("✅ Health check - Service opérationnel")
     return {
         "status": "healthy",
-        "model": "distilbert-base-uncased-finetuned-sst-2-english",
+        "model": analyzer.model_name,
         "message": "Service d'analyse de sentiment opérationnel"
     }
 
@@ -94,24 +191,18 @@ async def predict_sentiment(request: TextRequest):
                 detail="Service indisponible - Modèle non chargé"
             )
         
-        # Validation du texte
-        if not request.text or not request.text.strip():
-            logger.warning("⚠️ Tentative d'analyse avec texte vide")
-            raise HTTPException(
-                status_code=400,
-                detail="Le texte ne peut pas être vide"
-            )
-        
-        # Analyse du sentiment
-        logger.info(f"🔍 Analyse du texte: '{request.text[:50]}...'")
-        result = analyzer.analyze(request.text.strip())
+        # Analyse du sentiment (texte déjà strippé et non vide: validé par TextRequest)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"🔍 Analyse du texte: '{request.text[:50]}...'")
+        result = await analyze_batched(request.text)
         
         response = SentimentResponse(
             sentiment=result["sentiment"],
             confidence=result["confidence"]
         )
         
-        logger.info(f"✅ Analyse terminée - Sentiment: {response.sentiment}, Confiance: {response.confidence}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"✅ Analyse terminée - Sentiment: {response.sentiment}, Confiance: {response.confidence}")
         return response
         
     except HTTPException:
@@ -124,38 +215,111 @@ async def predict_sentiment(request: TextRequest):
             detail="Erreur interne du serveur"
         )
 
+@app.post("/predict_batch", response_model=List[SentimentResponse], responses={400: {"model": ErrorResponse}})
+async def predict_sentiment_batch(request: BatchRequest):
+    """
+    Analyser le sentiment de plusieurs textes en une seule requête
+    
+    À privilégier pour scorer plusieurs textes: un seul aller-retour HTTP et
+    un seul passage du modèle pour tout le lot.
+    
+    - **texts**: Liste de 1 à 64 textes non vides
+    
+    Retourne la liste des résultats, dans l'ordre des textes:
+    - **sentiment**: POSITIVE ou NEGATIVE
+    - **confidence**: Score de confiance entre 0 et 1
+    """
+    try:
+        if analyzer is None:
+            logger.error("❌ Tentative d'analyse avec modèle non chargé")
+            raise HTTPException(
+                status_code=503,
+                detail="Service indisponible - Modèle non chargé"
+            )
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"🔍 Analyse d'un lot de {len(request.texts)} textes")
+        # Le lot est déjà constitué: forward direct, sans passer par le micro-batcher
+        results = await asyncio.get_running_loop().run_in_executor(
+            inference_executor, analyzer.analyze_batch, request.texts
+        )
+        
+        return [
+            SentimentResponse(sentiment=result["sentiment"], confidence=result["confidence"])
+            for result in results
+        ]
+        
+    except HTTPException:
+        # Re-lancer les erreurs HTTP
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erreur inattendue lors de l'analyse du lot: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Erreur interne du serveur"
+        )
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Statistiques du cache LRU des prédictions
+    
+    Chaque worker a son propre cache: les chiffres sont ceux du worker qui a
+    servi la requête, identifié par son pid
+    """
+    if analyzer is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Service indisponible - Modèle non chargé"
+        )
+    return {"pid": os.getpid(), **analyzer.cache_info()}
+
 @app.get("/models")
 async def get_model_info():
-    """Informations sur le modèle utilisé"""
-    return {
-        "model_name": "distilbert-base-uncased-finetuned-sst-2-english",
-        "model_type": "DistilBERT",
+    """Informations sur le modèle utilisé (choisi via SENTIMENT_MODEL)"""
+    info = {
+        "model_name": MODEL_NAME,
+        "model_type": None,
         "task": "sentiment-analysis",
         "languages": ["en"],
         "labels": ["NEGATIVE", "POSITIVE"]
     }
+    if analyzer is not None:
+        info.update(analyzer.get_model_info())
+    return info
 
 # Gestion des erreurs globales
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content={
             "error": "Endpoint non trouvé",
-            "available_endpoints": ["/docs", "/predict", "/health"]
+            "available_endpoints": ["/docs", "/predict", "/predict_batch", "/health"]
         }
     )
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
     """Gestion personnalisée des erreurs de validation (422 → 400)"""
-    return JSONResponse(
+    if any("texts" in error["loc"] for error in exc.errors()):
+        detail = f"La requête doit contenir de 1 à {MAX_BATCH_SIZE} textes non vides"
+    else:
+        detail = "Le texte ne peut pas être vide"
+    return ORJSONResponse(
         status_code=HTTP_400_BAD_REQUEST,
-        content={"detail": "Le texte ne peut pas être vide"}
+        content={"detail": detail}
     )
 
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.environ["WEB_CONCURRENCY"]),
+        loop="uvloop",
+        http="httptools"
+    )
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Export du modèle de sentiment en ONNX puis quantification INT8 (AVX512-VNNI)
+
+Génère le répertoire chargé par SentimentAnalyzer lorsque SENTIMENT_BACKEND=onnx.
+
+- Dynamique (défaut): poids int8, activations quantifiées à la volée.
+- Statique (--static): activations quantifiées avec des plages calibrées sur
+  des phrases SST-2, sans quantize/dequantize dynamique entre les couches.
+  Si la précision SST-2 baisse de plus de 1 % face au FP32, le répertoire
+  produit est supprimé et le script sort en erreur. Nécessite datasets.
+
+Usage:
+    SENTIMENT_MODEL=<modèle> python export_onnx.py [--static]
+"""
+from functools import partial
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoCalibrationConfig, AutoQuantizationConfig
+from transformers import AutoTokenizer
+from sentiment_analyzer import MAX_LENGTH, MODEL_NAME, SOURCE_MODEL_ATTR
+import argparse
+import logging
+import shutil
+import sys
+import torch
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = "onnx"
+QUANTIZED_DIR = "onnx-int8"
+STATIC_QUANTIZED_DIR = "onnx-int8-static"
+
+# Phrases SST-2 utilisées pour calibrer les plages d'activation
+CALIBRATION_SAMPLES = 200
+# Perte de précision tolérée par rapport au modèle FP32 (quantification statique)
+MAX_ACCURACY_DROP = 0.01
+
+
+def preprocess(examples, tokenizer):
+    """Tokenise un lot SST-2 pour la calibration"""
+    return tokenizer(
+        examples["sentence"],
+        padding="max_length",
+        truncation=True,
+        max_length=MAX_LENGTH
+    )
+
+
+def evaluate(model_dir, tokenizer, dataset, batch_size=32):
+    """Précision d'un modèle ONNX sur un split SST-2 (label 1 = positif)"""
+    model = ORTModelForSequenceClassification.from_pretrained(model_dir)
+    correct = 0
+    for start in range(0, len(dataset), batch_size):
+        batch = dataset[start:start + batch_size]
+        encoded = tokenizer(
+            batch["sentence"],
+            padding=True,
+            truncation=True,
+            max_length=MAX_LENGTH,
+            return_tensors="pt"
+        )
+        predictions = model(**encoded).logits.argmax(dim=-1)
+        correct += int((predictions == torch.tensor(batch["label"])).sum())
+    return correct / len(dataset)
+
+
+def quantize_static(quantizer, tokenizer):
+    """Quantification statique avec plages d'activation calibrées sur SST-2"""
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=True, per_channel=True)
+    calibration_dataset = quantizer.get_calibration_dataset(
+        "glue",
+        dataset_config_name="sst2",
+        preprocess_function=partial(preprocess, tokenizer=tokenizer),
+        num_samples=CALIBRATION_SAMPLES,
+        dataset_split="train"
+    )
+    calibration_config = AutoCalibrationConfig.minmax(calibration_dataset)
+    ranges = quantizer.fit(
+        dataset=calibration_dataset,
+        calibration_config=calibration_config,
+        operators_to_quantize=qconfig.operators_to_quantize
+    )
+    quantizer.quantize(
+        save_dir=STATIC_QUANTIZED_DIR,
+        quantization_config=qconfig,
+        calibration_tensors_range=ranges,
+        file_suffix=None
+    )
+
+
+def check_accuracy(tokenizer) -> bool:
+    """Vrai si le modèle statique perd au plus MAX_ACCURACY_DROP face au modèle FP32"""
+    from datasets import load_dataset
+
+    validation = load_dataset("glue", "sst2", split="validation")
+    baseline = evaluate(EXPORT_DIR, tokenizer, validation)
+    quantized = evaluate(STATIC_QUANTIZED_DIR, tokenizer, validation)
+    logger.info(f"📊 Précision SST-2: FP32 {baseline:.4f}, INT8 statique {quantized:.4f}")
+    return baseline - quantized <= MAX_ACCURACY_DROP
+
+
+def main():
+    """Exporte le modèle FP32 en ONNX puis le quantifie pour AVX512-VNNI"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--static",
+        action="store_true",
+        help="quantification statique calibrée sur SST-2"
+    )
+    args = parser.parse_args()
+
+    logger.info(f"🔄 Export ONNX de {MODEL_NAME} vers {EXPORT_DIR}/...")
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model.save_pretrained(EXPORT_DIR)
+    tokenizer.save_pretrained(EXPORT_DIR)
+
+    quantizer = ORTQuantizer.from_pretrained(EXPORT_DIR)
+    if args.static:
+        save_dir = STATIC_QUANTIZED_DIR
+        logger.info(f"🔄 Quantification INT8 statique vers {save_dir}/...")
+        quantize_static(quantizer, tokenizer)
+    else:
+        save_dir = QUANTIZED_DIR
+        logger.info(f"🔄 Quantification INT8 dynamique vers {save_dir}/...")
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        # file_suffix=None pour obtenir directement model.onnx
+        quantizer.quantize(save_dir=save_dir, quantization_config=qconfig, file_suffix=None)
+    tokenizer.save_pretrained(save_dir)
+    # Le nom du modèle source est relu au chargement pour /health et /models
+    setattr(model.config, SOURCE_MODEL_ATTR, MODEL_NAME)
+    model.config.save_pretrained(save_dir)
+
+    if args.static and not check_accuracy(tokenizer):
+        # Le modèle rejeté ne doit pas pouvoir être chargé via SENTIMENT_ONNX_DIR
+        shutil.rmtree(save_dir)
+        logger.error(
+            f"❌ Perte de précision supérieure à {MAX_ACCURACY_DROP}: {save_dir}/ supprimé, "
+            f"utiliser la quantification dynamique"
+        )
+        sys.exit(1)
+
+    logger.info(f"✅ Modèle INT8 disponible dans {save_dir}/model.onnx")
+
+
+if __name__ == "__main__":
+    main()
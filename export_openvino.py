@@ -0,0 +1,42 @@
+"""
+Export du modèle de sentiment en OpenVINO IR avec poids compressés en INT8
+
+Génère le répertoire chargé par SentimentAnalyzer lorsque SENTIMENT_BACKEND=openvino:
+l'export est fait une fois ici plutôt qu'à chaque démarrage de chaque worker.
+
+Usage:
+    SENTIMENT_MODEL=<modèle> python export_openvino.py
+"""
+from optimum.intel import OVModelForSequenceClassification
+from transformers import AutoTokenizer
+from sentiment_analyzer import MODEL_NAME, OPENVINO_MODEL_DIR, SOURCE_MODEL_ATTR
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Exporte le modèle en OpenVINO IR et le sauvegarde avec son tokenizer"""
+    logger.info(f"🔄 Export OpenVINO INT8 de {MODEL_NAME} vers {OPENVINO_MODEL_DIR}/...")
+    # compile=False: le modèle n'est pas exécuté ici, seul l'IR est écrit
+    model = OVModelForSequenceClassification.from_pretrained(
+        MODEL_NAME,
+        export=True,
+        load_in_8bit=True,
+        compile=False
+    )
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    # Le nom du modèle source est relu au chargement pour /health et /models
+    setattr(model.config, SOURCE_MODEL_ATTR, MODEL_NAME)
+    model.save_pretrained(OPENVINO_MODEL_DIR)
+    tokenizer.save_pretrained(OPENVINO_MODEL_DIR)
+
+    logger.info(f"✅ Modèle OpenVINO disponible dans {OPENVINO_MODEL_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
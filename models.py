@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Literal
+from typing import List, Literal
+
+# Nombre maximal de textes acceptés par /predict_batch
+MAX_BATCH_SIZE = 64
 
 class TextRequest(BaseModel):
     """Modèle pour la requête d'analyse de sentiment"""
@@ -12,10 +15,32 @@ class TextRequest(BaseModel):
 
     @field_validator('text')
     def validate_text(cls, v: str) -> str:
-        """Valider que le texte n'est pas vide après suppression des espaces"""
-        if not v or not v.strip():
+        """Valider que le texte n'est pas vide et le stocker sans espaces superflus"""
+        v = v.strip()
+        if not v:
+            raise ValueError('Le texte ne peut pas être vide')
+        return v
+
+
+class BatchRequest(BaseModel):
+    """Modèle pour la requête d'analyse de sentiment par lot"""
+    texts: List[str] = Field(
+        ...,
+        description=f"Textes à analyser (1 à {MAX_BATCH_SIZE}), traités en un seul passage du modèle",
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        json_schema_extra={"example": ["I love this product!", "Worst purchase ever."]}
+    )
+
+    @field_validator('texts')
+    def validate_texts(cls, v: List[str]) -> List[str]:
+        """Valider chaque texte comme dans TextRequest"""
+        texts = [text.strip() for text in v]
+        if not all(texts):
             raise ValueError('Le texte ne peut pas être vide')
-        return v.strip()
+        if any(len(text) > 5000 for text in texts):
+            raise ValueError('Chaque texte doit faire au plus 5000 caractères')
+        return texts
 
 
 class SentimentResponse(BaseModel):
@@ -0,0 +1,23 @@
+#!/bin/sh
+# Démarrage de l'API avec Uvicorn (boucle uvloop, parseur httptools)
+#
+# NUMA_NODE=<n>: workers et allocations épinglés sur le nœud NUMA n, pour que
+# les poids du modèle restent dans la mémoire locale des cœurs qui les lisent.
+# Sur un hôte multi-socket, lancer un conteneur par nœud (nécessite
+# --cap-add SYS_NICE pour numactl --membind).
+set -e
+
+set -- uvicorn app:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
+
+# Avec un seul worker, ses threads OpenMP sont fixés chacun sur un cœur. Avec
+# plusieurs workers, ils s'empileraient tous sur les mêmes premiers cœurs.
+if [ "${WEB_CONCURRENCY:-1}" = "1" ]; then
+    export OMP_PROC_BIND="${OMP_PROC_BIND:-close}"
+    export OMP_PLACES="${OMP_PLACES:-cores}"
+    export KMP_AFFINITY="${KMP_AFFINITY:-granularity=fine,compact,1,0}"
+fi
+
+if [ -n "$NUMA_NODE" ]; then
+    exec numactl --cpunodebind="$NUMA_NODE" --membind="$NUMA_NODE" "$@"
+fi
+exec "$@"
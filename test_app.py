@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+pytest.importorskip("torch")
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+
+class StubAnalyzer:
+    """Remplace le modèle: sentiment déduit du texte, confiance propre à chaque texte"""
+
+    model_name = "stub"
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_batch(self, texts):
+        self.calls.append(list(texts))
+        return [
+            {"sentiment": "POSITIVE" if "good" in text else "NEGATIVE", "confidence": len(text) / 100}
+            for text in texts
+        ]
+
+    def analyze(self, text):
+        return self.analyze_batch([text])[0]
+
+    def cache_info(self):
+        return {"hits": 0, "misses": 0, "maxsize": 4096, "currsize": 0}
+
+
+class FailingAnalyzer(StubAnalyzer):
+    def analyze_batch(self, texts):
+        self.calls.append(list(texts))
+        raise RuntimeError("forward en échec")
+
+
+@pytest.fixture
+def use_analyzer(monkeypatch):
+    """Le lifespan instancie la classe donnée; l'état global est restauré après le test"""
+    monkeypatch.setattr(app_module, "analyzer", None)
+    monkeypatch.setattr(app_module, "batch_queue", None)
+
+    def use(analyzer_class):
+        monkeypatch.setattr(app_module, "SentimentAnalyzer", analyzer_class)
+
+    return use
+
+
+@pytest.fixture
+def client(use_analyzer):
+    use_analyzer(StubAnalyzer)
+    with TestClient(app_module.app) as client:
+        yield client
+
+
+def predict_concurrently(texts):
+    """Envoie les requêtes /predict en parallèle, lifespan (batcher) démarré"""
+    async def run():
+        async with app_module.lifespan(app_module.app):
+            transport = httpx.ASGITransport(app=app_module.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(
+                    *(client.post("/predict", json={"text": text}) for text in texts)
+                )
+            return responses, app_module.analyzer
+
+    return asyncio.run(run())
+
+
+def test_predict_batch_keeps_text_order(client):
+    texts = ["good film", "bad", "good enough plot", "really bad acting"]
+    response = client.post("/predict_batch", json={"texts": texts})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"sentiment": "POSITIVE" if "good" in text else "NEGATIVE", "confidence": len(text) / 100}
+        for text in texts
+    ]
+
+
+@pytest.mark.parametrize("texts", [[], ["text"] * 65, ["good", "   "]])
+def test_predict_batch_rejects_invalid_batches(client, texts):
+    response = client.post("/predict_batch", json={"texts": texts})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "La requête doit contenir de 1 à 64 textes non vides"}
+
+
+def test_concurrent_predicts_are_merged_into_one_batch(use_analyzer, monkeypatch):
+    use_analyzer(StubAnalyzer)
+    # Fenêtre large: toutes les requêtes arrivent avant la fermeture du batch
+    monkeypatch.setattr(app_module, "MAX_WAIT_MS", 500)
+    texts = [f"good review {i}" for i in range(5)] + ["bad review"]
+
+    responses, analyzer = predict_concurrently(texts)
+
+    assert len(analyzer.calls) == 1
+    assert sorted(analyzer.calls[0]) == sorted(texts)
+    for text, response in zip(texts, responses):
+        assert response.status_code == 200
+        assert response.json() == {
+            "sentiment": "POSITIVE" if "good" in text else "NEGATIVE",
+            "confidence": len(text) / 100
+        }
+
+
+def test_batch_failure_reaches_every_request(use_analyzer, monkeypatch):
+    use_analyzer(FailingAnalyzer)
+    monkeypatch.setattr(app_module, "MAX_WAIT_MS", 500)
+
+    responses, analyzer = predict_concurrently([f"text {i}" for i in range(4)])
+
+    assert len(analyzer.calls) == 1
+    assert [response.status_code for response in responses] == [500] * 4
+    assert all(response.json() == {"detail": "Erreur interne du serveur"} for response in responses)
+
+
+def test_cache_stats_identify_the_worker(client):
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    assert response.json() == {"pid": os.getpid(), "hits": 0, "misses": 0, "maxsize": 4096, "currsize": 0}
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import sentiment_analyzer
+from sentiment_analyzer import SentimentAnalyzer
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    try:
+        return SentimentAnalyzer()
+    except RuntimeError as e:
+        # Modèle absent du cache local et Hub injoignable
+        pytest.skip(f"Modèle indisponible: {e}")
+
+
+def test_positive_sentence(analyzer):
+    result = analyzer.analyze("I love it")
+    assert result["sentiment"] == "POSITIVE"
+    assert result["confidence"] > 0.5
+
+
+def test_negative_sentence(analyzer):
+    result = analyzer.analyze("This is terrible, I hate it and want my money back.")
+    assert result["sentiment"] == "NEGATIVE"
+    assert result["confidence"] > 0.5
+
+
+@pytest.mark.parametrize("setting, value", [("BACKEND", "tensorrt"), ("PRECISION", "fp8")])
+def test_unsupported_setting_fails_at_load(monkeypatch, setting, value):
+    monkeypatch.setattr(sentiment_analyzer, setting, value)
+    with pytest.raises(RuntimeError, match=f"{value} non supporté"):
+        SentimentAnalyzer()
@@ -0,0 +1,105 @@
+from token_cache import PreTokenizedCache
+
+FINGERPRINT = "distilbert-base-uncased|30522|abc"
+
+
+def make_cache(path, fingerprint=FINGERPRINT, max_length=8, capacity=3):
+    return PreTokenizedCache(str(path), max_length, fingerprint, capacity=capacity)
+
+
+def test_get_returns_stored_ids(tmp_path):
+    cache = make_cache(tmp_path / "tokens.bin")
+    cache.put("hello world", [101, 7592, 2088, 102])
+    assert cache.get("hello world") == [101, 7592, 2088, 102]
+    assert cache.get("unknown") is None
+
+
+def test_batch_lookup_and_store(tmp_path):
+    cache = make_cache(tmp_path / "tokens.bin")
+    cache.put_many(["a", "b"], [[101, 1, 102], [101, 2, 102]])
+    found = cache.get_many(["b", "missing", "a"])
+    assert found[0].tolist() == [101, 2, 102]
+    assert found[1] is None
+    assert found[2].tolist() == [101, 1, 102]
+
+
+def test_ids_are_truncated_to_max_length(tmp_path):
+    cache = make_cache(tmp_path / "tokens.bin", max_length=4)
+    cache.put("long", list(range(10)))
+    assert cache.get("long") == [0, 1, 2, 3]
+
+
+def test_wraparound_evicts_oldest_entry(tmp_path):
+    cache = make_cache(tmp_path / "tokens.bin", capacity=3)
+    for i, text in enumerate(["a", "b", "c", "d"]):
+        cache.put(text, [101, i, 102])
+    assert cache.get("a") is None
+    assert cache.get("b") == [101, 1, 102]
+    assert cache.get("d") == [101, 3, 102]
+
+
+def test_entries_survive_reopen(tmp_path):
+    path = tmp_path / "tokens.bin"
+    cache = make_cache(path)
+    for i, text in enumerate(["a", "b", "c", "d"]):
+        cache.put(text, [101, i, 102])
+    cache.close()
+
+    reopened = make_cache(path)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == [101, 2, 102]
+    # L'écriture reprend après le dernier slot écrit: "b" est le plus ancien
+    reopened.put("e", [101, 4, 102])
+    assert reopened.get("b") is None
+    assert reopened.get("d") == [101, 3, 102]
+    assert reopened.get("e") == [101, 4, 102]
+
+
+def test_other_tokenizer_starts_fresh_file(tmp_path):
+    path = tmp_path / "tokens.bin"
+    cache = make_cache(path)
+    cache.put("hello", [101, 7592, 102])
+    cache.close()
+
+    other = make_cache(path, fingerprint="bert-base-cased|28996|def")
+    assert other.get("hello") is None
+    other.close()
+
+    # Le fichier appartient désormais au nouveau tokenizer
+    assert make_cache(path).get("hello") is None
+
+
+def test_other_max_length_starts_fresh_file(tmp_path):
+    path = tmp_path / "tokens.bin"
+    cache = make_cache(path, max_length=8)
+    cache.put("hello", [101, 7592, 102])
+    cache.close()
+
+    assert make_cache(path, max_length=16).get("hello") is None
+
+
+def test_workers_sharing_a_file_do_not_overwrite_each_other(tmp_path):
+    path = tmp_path / "tokens.bin"
+    first = make_cache(path)
+    second = make_cache(path)
+
+    first.put("alpha", [101, 1, 102])
+    second.put("beta", [101, 2, 102])
+    assert first.get("alpha") == [101, 1, 102]
+    assert second.get("beta") == [101, 2, 102]
+
+    # Un worker démarré ensuite voit les écritures des deux
+    third = make_cache(path)
+    assert third.get("alpha") == [101, 1, 102]
+    assert third.get("beta") == [101, 2, 102]
+
+
+def test_slot_overwritten_by_other_worker_is_a_miss(tmp_path):
+    path = tmp_path / "tokens.bin"
+    first = make_cache(path, capacity=2)
+    second = make_cache(path, capacity=2)
+
+    first.put("alpha", [101, 1, 102])
+    second.put("beta", [101, 2, 102])
+    second.put("gamma", [101, 3, 102])
+    assert first.get("alpha") is None
@@ -0,0 +1,200 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Nombre de textes conservés sur disque avant écrasement des plus anciens
+TOKEN_CACHE_CAPACITY = 65536
+
+MAGIC = b"SENTTOK1"
+
+# En-tête du fichier: configuration qui a produit les slots et position
+# d'écriture, partagée par tous les workers qui ouvrent le même fichier
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("fingerprint", "S32"),
+    ("capacity", "<u8"),
+    ("max_length", "<u8"),
+    ("next_slot", "<u8"),
+    ("next_seq", "<u8")
+])
+
+
+def _text_key(text: str) -> int:
+    """Hash stable entre processus (hash() est salé à chaque démarrage)"""
+    key = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    # 0 est réservé aux slots vides
+    return key or 1
+
+
+def _fingerprint_digest(fingerprint: str) -> bytes:
+    """Condensé de l'empreinte du tokenizer, de taille fixe pour l'en-tête"""
+    return hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=16).hexdigest().encode("ascii")
+
+
+class PreTokenizedCache:
+    """
+    Cache persistant des input_ids, stocké dans un buffer circulaire mmap
+
+    Le fichier commence par un en-tête (empreinte du tokenizer, dimensions,
+    prochain slot à écrire) suivi des slots: clé du texte, numéro d'écriture,
+    longueur et input_ids (int32). L'index clé -> slot est reconstruit en
+    mémoire à l'ouverture, ce qui rend le cache réutilisable d'un démarrage à
+    l'autre. Les workers qui partagent le fichier se coordonnent par flock:
+    les écritures sont exclusives et la position d'écriture est relue dans
+    l'en-tête. Un fichier produit par un autre tokenizer est remplacé.
+    """
+
+    def __init__(self, path: str, max_length: int, fingerprint: str,
+                 capacity: int = TOKEN_CACHE_CAPACITY):
+        self.path = path
+        self.max_length = max_length
+        self.capacity = capacity
+        self._lock = threading.Lock()
+
+        slot_dtype = np.dtype([
+            ("key", "<u8"),
+            ("seq", "<u8"),
+            ("length", "<i4"),
+            ("ids", "<i4", (max_length,))
+        ])
+        size = HEADER_DTYPE.itemsize + slot_dtype.itemsize * capacity
+        expected = np.zeros((), dtype=HEADER_DTYPE)
+        expected["magic"] = MAGIC
+        expected["fingerprint"] = _fingerprint_digest(fingerprint)
+        expected["capacity"] = capacity
+        expected["max_length"] = max_length
+        expected["next_seq"] = 1
+
+        self._fd = self._open_locked()
+        try:
+            if not self._matches(expected, size):
+                # Autre tokenizer ou autres dimensions: nouveau fichier
+                self._fd = self._replace(expected, size)
+            self._mmap = mmap.mmap(self._fd, size)
+            self._header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._mmap)
+            self._slots = np.ndarray(
+                (capacity,), dtype=slot_dtype, buffer=self._mmap, offset=HEADER_DTYPE.itemsize
+            )
+
+            self._index: Dict[int, int] = {}
+            used = np.nonzero(self._slots["seq"])[0]
+            for slot in used[np.argsort(self._slots["seq"][used])]:
+                self._index[int(self._slots["key"][slot])] = int(slot)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        logger.info(f"🗄️ Cache de tokens {path}: {len(self._index)} textes chargés")
+
+    def _open_locked(self) -> int:
+        """Ouvre le fichier sous verrou exclusif, en suivant un éventuel remplacement"""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # Un autre worker a pu remplacer le fichier pendant l'attente du verrou
+            if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                return fd
+            os.close(fd)
+
+    def _matches(self, expected: np.ndarray, size: int) -> bool:
+        """Vérifie que le fichier ouvert a été produit avec la même configuration"""
+        if os.fstat(self._fd).st_size != size:
+            return False
+        header = np.frombuffer(os.pread(self._fd, HEADER_DTYPE.itemsize, 0), dtype=HEADER_DTYPE)[0]
+        return all(
+            header[field] == expected[field]
+            for field in ("magic", "fingerprint", "capacity", "max_length")
+        )
+
+    def _replace(self, expected: np.ndarray, size: int) -> int:
+        """
+        Crée un fichier vierge et le substitue atomiquement à l'ancien
+
+        Les processus qui ont encore l'ancien fichier ouvert gardent leur
+        inode intact. Le verrou de l'ancien fichier n'est relâché qu'après la
+        substitution, les autres workers rouvrent donc le nouveau.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        os.ftruncate(fd, size)
+        os.pwrite(fd, expected.tobytes(), 0)
+        os.replace(tmp_path, self.path)
+        os.close(self._fd)
+        return fd
+
+    @contextmanager
+    def _locked(self, operation: int):
+        """Verrou entre threads du worker puis verrou fichier entre workers"""
+        with self._lock:
+            fcntl.flock(self._fd, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def get(self, text: str) -> Optional[List[int]]:
+        """Retourne les input_ids du texte, ou None s'il n'est pas en cache"""
+        ids = self.get_many([text])[0]
+        return None if ids is None else ids.tolist()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Recherche un batch de textes sous un seul verrou (None pour chaque absent)"""
+        keys = [_text_key(text) for text in texts]
+        results = []
+        with self._locked(fcntl.LOCK_SH):
+            for key in keys:
+                slot = self._index.get(key)
+                if slot is None:
+                    results.append(None)
+                    continue
+                record = self._slots[slot]
+                # Slot réécrit depuis par un autre worker
+                if record["key"] != key:
+                    del self._index[key]
+                    results.append(None)
+                    continue
+                results.append(record["ids"][:record["length"]].copy())
+        return results
+
+    def put(self, text: str, input_ids: List[int]):
+        """Écrit les input_ids dans le prochain slot du buffer circulaire"""
+        self.put_many([text], [input_ids])
+
+    def put_many(self, texts: List[str], input_ids: List[List[int]]):
+        """Écrit un batch de textes dans les slots suivants, sous un seul verrou"""
+        keys = [_text_key(text) for text in texts]
+        with self._locked(fcntl.LOCK_EX):
+            for key, ids in zip(keys, input_ids):
+                length = min(len(ids), self.max_length)
+                slot = int(self._header["next_slot"])
+                record = self._slots[slot]
+
+                previous_key = int(record["key"])
+                if self._index.get(previous_key) == slot:
+                    del self._index[previous_key]
+
+                record["key"] = key
+                record["seq"] = self._header["next_seq"]
+                record["length"] = length
+                record["ids"][:length] = ids[:length]
+
+                self._header["next_slot"] = (slot + 1) % self.capacity
+                self._header["next_seq"] += 1
+                self._index[key] = slot
+
+    def close(self):
+        """Écrit les pages modifiées sur disque et libère le fichier"""
+        with self._lock:
+            self._mmap.flush()
+            del self._header, self._slots
+            self._mmap.close()
+            os.close(self._fd)